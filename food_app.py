@@ -1,135 +1,377 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import folium
+from folium.plugins import MarkerCluster
 from streamlit_folium import folium_static
 import googlemaps
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime
 import time
-import pytz
+from zoneinfo import ZoneInfo
 import random
+import re
+import heapq
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+try:
+    import orjson
+except ImportError:
+    orjson = None
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+HTTP_POOL_SIZE = 20  # Keep-alive connections shared by the worker threads
+EARTH_RADIUS_M = 6371000
+PLACE_ICON = dict(color="green", icon="utensils", prefix='fa')  # Each marker needs its own Icon element, so share the kwargs
+SG_TZ = ZoneInfo('Asia/Singapore')
+GEOCODE_TTL = 7 * 24 * 3600  # Addresses basically never move
+OPEN_NOW_MAX_AGE = 10 * 60  # Nearby results carry the open_now flag shown as "Open Now", so they must stay fresh
+NEARBY_TTL = OPEN_NOW_MAX_AGE // 2  # Both cache layers can hold a response this long, so open_now is at most OPEN_NOW_MAX_AGE old
+NEARBY_GRID_DECIMALS = 3  # Round search centres to ~100 m so nearby addresses share cached results
+NEARBY_EXTRA_PAGES = 2  # Places Nearby returns up to 3 pages of 20 results
+NEXT_PAGE_TOKEN_DELAY = 2  # Seconds before a fresh next_page_token becomes valid
+DETAILS_TTL = 24 * 3600
+DISTANCE_TTL = 24 * 3600
+SORT_ORDERS = {"Distance": True, "Price Level": True, "Rating": False, "Number of Reviews": False}  # Sort option -> ascending
+RATE_LIMIT_RPM = 3000  # Aggregate request budget shared by all threads
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+CSS_PATH = os.path.join(APP_DIR, "style.css")
+CACHE_DB_PATH = os.environ.get("FOODNEARME_CACHE_DB", os.path.join(APP_DIR, "cache.sqlite"))
+CACHE_REPLAY = os.environ.get("FOODNEARME_CACHE_REPLAY") == "1"  # Serve only from the disk cache, never call the API
+
+class TokenBucket:
+    # Refills at rpm/60 tokens per second up to one second's worth of burst; safe to share across threads
+    def __init__(self, rpm):
+        self.rate = rpm / 60
+        self.capacity = self.rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+json_loads = orjson.loads if orjson else json.loads
 
 # Utility functions
-@st.cache_data(ttl=3600)
-def get_coordinates(address):
-    try:
-        geocode_result = gmaps.geocode(address)
-        if geocode_result:
-            location = geocode_result[0]['geometry']['location']
-            return location['lat'], location['lng']
-    except Exception as e:
-        st.error(f"Error getting coordinates: {str(e)}")
+@st.cache_data
+def load_css():
+    with open(CSS_PATH) as f:
+        return f.read()
+
+def thread_pool(max_workers):
+    # Attach the current script context so st.* calls made from worker threads still render
+    return ThreadPoolExecutor(max_workers=max_workers, initializer=add_script_run_ctx, initargs=(None, get_script_run_ctx()))
+
+@st.cache_resource
+def get_response_cache():
+    conn = sqlite3.connect(CACHE_DB_PATH, check_same_thread=False)
+    conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, timestamp REAL, body TEXT)")
+    if not CACHE_REPLAY:
+        # Nothing outlives the longest TTL, so drop those rows to keep the file bounded
+        conn.execute("DELETE FROM responses WHERE timestamp < ?", (time.time() - max(GEOCODE_TTL, NEARBY_TTL, DETAILS_TTL, DISTANCE_TTL),))
+    conn.commit()
+    return conn, threading.Lock()
+
+def cached_call(client, rate_limiter, func_name, ttl, not_before=None, postprocess=None, **kwargs):
+    # Disk-backed second level behind st.cache_data so API responses survive app restarts
+    key = hashlib.sha256(f"{func_name}|{json.dumps(kwargs, sort_keys=True)}".encode()).hexdigest()
+    conn, lock = get_response_cache()
+    with lock:
+        row = conn.execute("SELECT timestamp, body FROM responses WHERE key = ?", (key,)).fetchone()
+    if row and (CACHE_REPLAY or time.time() - row[0] <= ttl):
+        return json_loads(row[1])
+    if CACHE_REPLAY:
+        raise RuntimeError(f"No cached response for {func_name} (replay mode is on)")
+    if row:
+        with lock:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            conn.commit()
+    if not_before:
+        # Some requests (e.g. next_page_token) are only valid after a given time; only a real request needs to wait
+        time.sleep(max(0, not_before - time.time()))
+    rate_limiter.acquire()
+    result = getattr(client, func_name)(**kwargs)
+    if postprocess:
+        # Shrink the response before it is persisted, not just the in-memory copy
+        result = postprocess(result)
+    with lock:
+        conn.execute("INSERT OR REPLACE INTO responses (key, timestamp, body) VALUES (?, ?, ?)", (key, time.time(), json.dumps(result)))
+        conn.commit()
+    return result
+
+class NearbySearchError(Exception):
+    # Carries the partial results out of the cached nearby search so they are shown but never cached
+    def __init__(self, places, errors):
+        super().__init__('; '.join(errors))
+        self.places = places
+        self.errors = errors
+
+# The cached functions below let API errors propagate: st.cache_data does not store a call that raises,
+# so a transient failure is retried on the next run instead of being served for the whole TTL
+@st.cache_data(ttl=GEOCODE_TTL, max_entries=5000)
+def get_coordinates(address, _client, _rate_limiter):
+    geocode_result = cached_call(_client, _rate_limiter, 'geocode', GEOCODE_TTL, address=address)
+    if geocode_result:
+        location = geocode_result[0]['geometry']['location']
+        return location['lat'], location['lng']
     return None, None
 
-@st.cache_data(ttl=3600)
-def get_nearby_food_places(lat, lng, radius):
-    food_types = ['restaurant', 'cafe', 'bakery', 'bar', 'meal_takeaway', 'meal_delivery']
-    places = []
-    for food_type in food_types:
+def fetch_places_of_type(lat, lng, radius, food_type, client, rate_limiter):
+    # Returns (results, error); a failed later page keeps the pages already fetched
+    response = cached_call(client, rate_limiter, 'places_nearby', NEARBY_TTL, location=(lat, lng), radius=radius, type=food_type)
+    token_issued = time.time()
+    results = list(response.get('results', []))
+    for _ in range(NEARBY_EXTRA_PAGES):
+        token = response.get('next_page_token')
+        if not token:
+            break
         try:
-            results = gmaps.places_nearby(location=(lat, lng), radius=radius, type=food_type)
-            places.extend(results.get('results', []))
-            time.sleep(0.2)  # Add a small delay to avoid hitting API rate limits
+            response = cached_call(client, rate_limiter, 'places_nearby', NEARBY_TTL, not_before=token_issued + NEXT_PAGE_TOKEN_DELAY, page_token=token)
+            token_issued = time.time()
         except Exception as e:
-            st.error(f"Error fetching {food_type} places: {str(e)}")
-    return places
+            return results, f"Error fetching more {food_type} places: {str(e)}"
+        results.extend(response.get('results', []))
+    return results, None
 
-@st.cache_data(ttl=3600)
-def get_place_details(place_id):
-    try:
-        details = gmaps.place(place_id=place_id, fields=['name', 'rating', 'formatted_phone_number', 'opening_hours', 'price_level', 'type', 'website', 'formatted_address', 'reviews', 'user_ratings_total'])
-        return details.get('result', {})
-    except Exception as e:
-        st.error(f"Error fetching place details: {str(e)}")
-        return {}
+@st.cache_data(ttl=NEARBY_TTL, max_entries=1000)
+def get_nearby_food_places(lat, lng, radius, _client, _rate_limiter):
+    food_types = ['restaurant', 'cafe', 'bakery', 'bar', 'meal_takeaway', 'meal_delivery']
+    results_by_type = {}
+    errors = []
+    with thread_pool(max_workers=len(food_types)) as ex:
+        futures = {ex.submit(fetch_places_of_type, lat, lng, radius, food_type, _client, _rate_limiter): food_type for food_type in food_types}
+        for future in as_completed(futures):
+            food_type = futures[future]
+            try:
+                results_by_type[food_type], error = future.result()
+                if error:
+                    errors.append(error)
+            except Exception as e:
+                errors.append(f"Error fetching {food_type} places: {str(e)}")
+    # Flatten in food_types order so results stay stable regardless of completion order,
+    # keeping the first occurrence of places listed under several types
+    places = {}
+    for food_type in food_types:
+        for place in results_by_type.get(food_type, []):
+            places.setdefault(place['place_id'], place)
+    if errors:
+        raise NearbySearchError(list(places.values()), errors)
+    return list(places.values())
+
+def trim_reviews(details):
+    # Reviews carry author and profile metadata we never show; keep only what the reviews section renders
+    result = details.get('result', {})
+    if 'reviews' in result:
+        result['reviews'] = [{'rating': r['rating'], 'text': r.get('text', '')} for r in result['reviews']]
+    return details
+
+@st.cache_data(ttl=DETAILS_TTL, max_entries=2000)
+def get_place_details_full(place_id, _client, _rate_limiter):
+    # Everything the details and reviews sections need; only fetched for the selected place
+    details = cached_call(_client, _rate_limiter, 'place', DETAILS_TTL, postprocess=trim_reviews, place_id=place_id, fields=['rating', 'formatted_phone_number', 'opening_hours', 'price_level', 'type', 'website', 'formatted_address', 'reviews', 'user_ratings_total'])
+    return details.get('result', {})
 
 def create_map(lat, lng, places):
     m = folium.Map(location=[lat, lng], zoom_start=16, tiles="CartoDB positron")
     folium.Marker([lat, lng], popup="Your Location", icon=folium.Icon(color="red", icon="user", prefix='fa', icon_size=(42, 42))).add_to(m)
+    # Cluster the place markers inside one layer so large result sets render as a single Leaflet group
+    places_layer = folium.FeatureGroup(name="Food places").add_to(m)
+    cluster = MarkerCluster().add_to(places_layer)
     for place in places:
         place_lat, place_lng = place['geometry']['location']['lat'], place['geometry']['location']['lng']
-        folium.Marker([place_lat, place_lng], popup=place['name'], icon=folium.Icon(color="green", icon="utensils", prefix='fa')).add_to(m)
+        folium.Marker([place_lat, place_lng], popup=place['name'], icon=folium.Icon(**PLACE_ICON)).add_to(cluster)
     return m
 
-@st.cache_data(ttl=3600)
-def calculate_distance(origin, destination):
-    try:
-        result = gmaps.distance_matrix(origin, destination, mode="walking")
-        if result['status'] == 'OK':
-            return result['rows'][0]['elements'][0]['distance']['text']
-    except Exception as e:
-        st.error(f"Error calculating distance: {str(e)}")
+def haversine(lat1, lng1, lat2, lng2):
+    # Straight-line distance in meters; works elementwise on NumPy arrays
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    dphi, dlambda = phi2 - phi1, np.radians(lng2 - lng1)
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+def format_price_level(level):
+    # Missing price levels are NaN; Google uses 0 for free places
+    if pd.isna(level):
+        return 'N/A'
+    return '$' * int(level) if level > 0 else 'Free'
+
+def format_distance(meters):
+    return f"{meters:.0f} m" if meters < 1000 else f"{meters / 1000:.1f} km"
+
+def sort_results(df, sort_option):
+    return df.sort_values(sort_option, ascending=SORT_ORDERS[sort_option])
+
+def style_results(df):
+    # Numeric columns stay numeric; the Styler formats them while serializing, with NaN ratings shown as N/A
+    return df.drop(columns=['Place ID']).style.format({'Rating': '{:.1f}', 'Price Level': format_price_level, 'Distance': format_distance}, na_rep='N/A').set_properties(**{'background-color': '#e0e7ff', 'color': '#1f2937'})
+
+@st.cache_data(ttl=DISTANCE_TTL, max_entries=10000)
+def calculate_distance(origin, destination, _client, _rate_limiter):
+    result = cached_call(_client, _rate_limiter, 'distance_matrix', DISTANCE_TTL, origins=[origin], destinations=[destination], mode="walking")
+    if result['status'] == 'OK':
+        element = result['rows'][0]['elements'][0]
+        if element.get('status') == 'OK':
+            return element['distance']['text']
     return "N/A"
 
 def is_open_now(opening_hours):
-    if not opening_hours or 'periods' not in opening_hours:
+    # Nearby search reports the current status directly as opening_hours.open_now; NEARBY_TTL keeps it fresh
+    if not opening_hours or 'open_now' not in opening_hours:
         return "Unknown"
-    singapore_tz = pytz.timezone('Asia/Singapore')
-    current_time = datetime.now(singapore_tz)
-    current_day, current_minutes = current_time.weekday(), current_time.hour * 60 + current_time.minute
-    for period in opening_hours['periods']:
-        if period['open']['day'] == current_day:
-            open_time = int(period['open']['time'][:2]) * 60 + int(period['open']['time'][2:])
-            # Check if 'close' key exists
-            if 'close' in period:
-                close_time = int(period['close']['time'][:2]) * 60 + int(period['close']['time'][2:])
-                if open_time <= current_minutes < close_time:
-                    return "Open"
-            else:
-                # If no 'close' time, assume it's open if current time is past opening time
-                if current_minutes >= open_time:
-                    return "Open"
-    return "Closed"
+    return "Open" if opening_hours['open_now'] else "Closed"
+
+def orjson_response_hook(response, *args, **kwargs):
+    # googlemaps decodes every response via response.json(); route it through orjson
+    response.json = lambda **kw: orjson.loads(response.content)
+    return response
 
 @st.cache_resource
 def get_gmaps_client():
-    return googlemaps.Client(key=st.secrets["GOOGLE_MAPS_API_KEY"])
+    # One pooled session and rate limiter shared by every session and worker thread
+    session = requests.Session()
+    retries = Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+    session.mount('https://', HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=retries))
+    if orjson:
+        session.hooks['response'].append(orjson_response_hook)
+    client = googlemaps.Client(key=st.secrets["GOOGLE_MAPS_API_KEY"], requests_session=session)
+    return client, TokenBucket(rpm=RATE_LIMIT_RPM)
+
+# Widget changes inside the results rerun only this fragment, not the geocode/nearby pipeline
+@st.fragment
+def render_results(lat, lng, df_filtered, place_locations, gmaps, rate_limiter):
+    # 1st expander section: Food Options
+    with st.expander("Food Options", expanded=True, icon = ":material/expand_content:"):
+        st.header("Food Options")
+        
+        # Add date and time box
+        current_time = datetime.now(SG_TZ)
+        st.markdown(f"""
+        <div class="date-time-box">
+            Current Date and Time: {current_time.strftime("%Y-%m-%d %H:%M:%S")}
+        </div>
+        """, unsafe_allow_html=True)
+        
+        # Create tabs
+        tab1, tab2 = st.tabs(["All Food Options", "10 Random Food Options"])
+        
+        with tab1:
+            if df_filtered.empty:
+                st.warning("No results match your current filters. Try adjusting the filters.")
+            else:
+                sort_option = st.selectbox("Sort by:", list(SORT_ORDERS), key="sort_option")
+                df_filtered = sort_results(df_filtered, sort_option)
+                
+                st.dataframe(style_results(df_filtered))
+        
+        with tab2:
+            if df_filtered.empty:
+                st.warning("No results match your current filters. Try adjusting the filters.")
+            else:
+                # Function to generate random options; only the sampled row labels are kept in session state
+                def generate_random_options():
+                    return np.random.default_rng().choice(len(df_filtered), size=min(10, len(df_filtered)), replace=False)
+
+                # Initialize session state for random options if it doesn't exist or no longer fits the filtered rows
+                if 'random_idx' not in st.session_state or st.session_state.random_idx.max() >= len(df_filtered):
+                    st.session_state.random_idx = generate_random_options()
+
+                # Button to regenerate random options
+                if st.button("🔄 Generate New Options"):
+                    st.session_state.random_idx = generate_random_options()
+                    st.balloons()
+
+                # Display the random options
+                st.dataframe(style_results(df_filtered.loc[st.session_state.random_idx]))
+    
+    # 2nd expander section: Select a place for more details
+    with st.expander("Select a place for more details", expanded=True, icon = ":material/expand_content:"):
+        st.header("Select a place for more details")
+        
+        selected_place = st.selectbox("Select a place:", df_filtered['Name'])
+        
+        if selected_place:
+            selected_place_id = df_filtered[df_filtered['Name'] == selected_place]['Place ID'].values[0]
+            try:
+                details = get_place_details_full(selected_place_id, gmaps, rate_limiter)
+            except Exception as e:
+                st.error(f"Error fetching place details: {str(e)}")
+                details = {}
+            try:
+                walking_distance = calculate_distance((lat, lng), place_locations[selected_place_id], gmaps, rate_limiter)
+            except Exception as e:
+                st.error(f"Error calculating distance: {str(e)}")
+                walking_distance = "N/A"
+            
+            st.subheader(f"Details for {selected_place}")
+            
+            detailed_data = {
+                'Details': [
+                    details.get('formatted_address', 'N/A'),
+                    details.get('formatted_phone_number', 'N/A'),
+                    details.get('website', 'N/A'),
+                    '\n'.join(details.get('opening_hours', {}).get('weekday_text', ['N/A'])),
+                    ', '.join(details.get('types', ['N/A'])),
+                    f"{details.get('rating', 'N/A')}",
+                    format_price_level(details.get('price_level', np.nan)),
+                    details.get('user_ratings_total', 'N/A'),
+                    walking_distance
+                ]
+            }
+            
+            detailed_df = pd.DataFrame(detailed_data, index=['Address', 'Phone', 'Website', 'Opening Hours', 'Types', 'Rating', 'Price Level', 'Number of Reviews', 'Walking Distance'])
+            st.dataframe(detailed_df.style.set_properties(**{'background-color': '#e0e7ff', 'color': '#1f2937', 'white-space': 'pre-wrap', 'word-wrap': 'break-word'}))
+    # 3rd expander section: Reviews
+    with st.expander("Reviews", expanded=True, icon = ":material/expand_content:"):
+        st.header("Reviews")
+        
+        if selected_place and 'reviews' in details:
+            reviews = details['reviews']
+            positive_reviews = heapq.nlargest(3, (r for r in reviews if r['rating'] >= 4), key=lambda x: x['rating'])
+            negative_reviews = heapq.nsmallest(3, (r for r in reviews if r['rating'] <= 2), key=lambda x: x['rating'])
+            
+            st.subheader("Top Positive Reviews")
+            if positive_reviews:
+                for review in positive_reviews:
+                    st.markdown(f"<p class='review-rating'>Rating: {'⭐' * int(review['rating'])}</p>", unsafe_allow_html=True)
+                    st.markdown(f"<div class='review-text'>{review['text']}</div>", unsafe_allow_html=True)
+            else:
+                st.write("No positive reviews available.")
+            
+            st.subheader("Top Negative Reviews")
+            if negative_reviews:
+                for review in negative_reviews:
+                    st.markdown(f"<p class='review-rating'>Rating: {'⭐' * int(review['rating'])}</p>", unsafe_allow_html=True)
+                    st.markdown(f"<div class='review-text'>{review['text']}</div>", unsafe_allow_html=True)
+            else:
+                st.write("No negative reviews available.")
+        else:
+            st.write("No reviews available for this place.")
 
 # Main application
 def main():
     st.set_page_config(page_title="Food Dining Options Nearby", layout="wide")
     
-    st.markdown("""
-        <style>
-        .reportview-container { background: #1E1E1E; }
-        .main { color: #FFFFFF; }
-        .stButton>button {
-            background-color: #4CAF50;
-            color: white;
-            padding: 10px 20px;
-            text-align: center;
-            text-decoration: none;
-            display: inline-block;
-            font-size: 16px;
-            margin: 4px 2px;
-            transition-duration: 0.4s;
-            cursor: pointer;
-            border-radius: 12px;
-            border: 2px solid #4CAF50;
-        }
-        .stButton>button:hover {
-            background-color: #45a049;
-            color: white;
-            border: 2px solid #45a049;
-        }
-        .stTextInput>div>div>input, .stSelectbox>div>div>select { background-color: #2C2C2C; color: #FFFFFF; }
-        .stDataFrame { background-color: #2C2C2C; padding: 1rem; border-radius: 5px; overflow-x: auto; }
-        .dataframe { color: #FFFFFF; width: 100%; }
-        h1, h2, h3 { color: #4CAF50; }
-        .review-text { color: #ffffff; background-color: rgba(0, 0, 0, 0.6); padding: 10px; border-radius: 5px; margin-bottom: 10px; }
-        .review-rating { color: #FFD700; font-weight: bold; }
-        @media (max-width: 768px) { .dataframe { font-size: 0.8em; } }
-        .stSlider [data-baseweb="slider"] { color: #FFFFFF !important; }
-        .date-time-box { background-color: #4CAF50; color: #FFFFFF; padding: 10px; border-radius: 5px; margin-bottom: 10px; }
-        .disclaimer { font-size: 0.8em; color: #888888; margin-top: 20px; }
-        .expander-label { font-size: 24px; font-weight: bold; color: #4CAF50; }
-        .expander-icon { color: #FF0000; font-size: 28px; vertical-align: middle; margin-right: 10px; }
-        </style>
-        """, unsafe_allow_html=True)
+    st.markdown(f"<style>{load_css()}</style>", unsafe_allow_html=True)
     
     st.title("Food Dining Options Nearby")
     
-    global gmaps
-    gmaps = get_gmaps_client()
+    gmaps, rate_limiter = get_gmaps_client()
     if not gmaps:
         st.error("Failed to initialize Google Maps client. Please check your API key.")
         st.stop()
@@ -139,171 +381,86 @@ def main():
         address = st.text_input("Enter your address:", placeholder="Enter your address here")
     with col2:
         radius = st.slider("Search radius (in meters)", 500, 5000, 1000, step=100)
+    max_results = st.sidebar.slider("Max results", 10, 60, 30, step=10)
     
     if address:
         with st.spinner("Fetching nearby food options..."):
-            lat, lng = get_coordinates(address)
+            try:
+                lat, lng = get_coordinates(address, gmaps, rate_limiter)
+            except Exception as e:
+                st.error(f"Error getting coordinates: {str(e)}")
+                lat, lng = None, None
             if lat and lng:
-                places = get_nearby_food_places(lat, lng, radius)
+                try:
+                    places = get_nearby_food_places(round(lat, NEARBY_GRID_DECIMALS), round(lng, NEARBY_GRID_DECIMALS), radius, gmaps, rate_limiter)
+                except NearbySearchError as e:
+                    for message in e.errors:
+                        st.error(message)
+                    places = e.places
+                # Cap the result set, keeping the best-rated candidates from the nearby search
+                places = sorted(places, key=lambda p: p.get('rating', 0), reverse=True)[:max_results]
                 
                 if places:
-                    st.subheader("Map")
-                    m = create_map(lat, lng, places)
-                    folium_static(m, width=1300, height=500)
+                    # Nearby-search results already carry every table column, so no per-place details call is needed
+                    place_ids = [p['place_id'] for p in places]
                     
-                    place_data = []
-                    place_details = {}
-                    for place in places:
-                        try:
-                            details = get_place_details(place['place_id'])
-                            place_details[place['place_id']] = details
-                            distance = calculate_distance((lat, lng), (place['geometry']['location']['lat'], place['geometry']['location']['lng']))
-                            open_status = is_open_now(details.get('opening_hours', {}))
-                            place_data.append({
-                                'Name': place['name'],
-                                'Rating': details.get('rating', 'N/A'),
-                                'Price Level': '$' * details.get('price_level', 0) or 'N/A',
-                                'Type': ', '.join(details.get('types', [])) or 'N/A',
-                                'Distance': distance,
-                                'Open Now': open_status,
-                                'Place ID': place['place_id'],
-                                'Number of Reviews': details.get('user_ratings_total', 0)
-                            })
-                        except Exception as e:
-                            st.error(f"Error processing place {place['name']}: {str(e)}")
-                            continue
+                    # Straight-line distances for the whole table; walking distance is only fetched for the selected place
+                    place_lats = np.array([p['geometry']['location']['lat'] for p in places])
+                    place_lngs = np.array([p['geometry']['location']['lng'] for p in places])
+                    place_locations = dict(zip(place_ids, zip(place_lats.tolist(), place_lngs.tolist())))
                     
-                    df = pd.DataFrame(place_data).drop_duplicates(subset=['Name', 'Distance'], keep='first')
+                    # Build the table column by column; numeric columns are formatted only when rendered
+                    df = pd.DataFrame({
+                        'Name': [p['name'] for p in places],
+                        'Rating': np.array([p.get('rating', np.nan) for p in places], dtype=np.float32),
+                        'Price Level': np.array([p.get('price_level', np.nan) for p in places], dtype=np.float32),
+                        'Type': [', '.join(p.get('types', [])) or 'N/A' for p in places],
+                        'Distance': haversine(lat, lng, place_lats, place_lngs),
+                        'Open Now': [is_open_now(p.get('opening_hours', {})) for p in places],
+                        'Place ID': place_ids,
+                        'Number of Reviews': np.array([p.get('user_ratings_total', 0) for p in places], dtype=np.int32)
+                    })
                     
                     # Filtering options
                     st.sidebar.subheader("Filter Options")
                     min_rating = st.sidebar.slider("Minimum Rating", 0.0, 5.0, 0.0, 0.1)
                     max_price = st.sidebar.selectbox("Maximum Price Level", ['Any', '$', '$$', '$$$', '$$$$'])
                     open_status_filter = st.sidebar.multiselect("Open Status", ["Open", "Closed", "Unknown"], default=["Open", "Unknown"])
-                    cuisine_types = list(set([cuisine for place in df['Type'].str.split(', ') for cuisine in place]))
+                    cuisine_types = sorted({cuisine for p in places for cuisine in p.get('types', [])})
                     selected_cuisines = st.sidebar.multiselect("Cuisine Type", cuisine_types)
                     
-                    # Apply filters
-                    df_filtered = df.copy()
-                    df_filtered['Rating'] = pd.to_numeric(df_filtered['Rating'], errors='coerce')
-                    df_filtered = df_filtered[
-                        (df_filtered['Rating'] >= min_rating) &
-                        (df_filtered['Open Now'].isin(open_status_filter)) &
-                        (df_filtered['Type'].apply(lambda x: any(cuisine in x for cuisine in selected_cuisines)) if selected_cuisines else True)
-                    ]
-                    
+                    # Apply filters as one boolean mask and a single indexing pass
+                    mask = (df['Rating'].to_numpy() >= min_rating) & df['Open Now'].isin(open_status_filter).to_numpy()
+                    if selected_cuisines:
+                        pattern = '|'.join(re.escape(c) for c in selected_cuisines)
+                        mask &= df['Type'].str.contains(pattern, regex=True, na=False).to_numpy()
                     if max_price != 'Any':
-                        df_filtered = df_filtered[df_filtered['Price Level'].str.len() <= len(max_price)]
+                        # NaN compares False, so places with an unknown price are excluded once a cap is set
+                        mask &= df['Price Level'].to_numpy() <= len(max_price)
+                    df_filtered = df.loc[mask].reset_index(drop=True)
                     
-                    # 1st expander section: Food Options
-                    with st.expander("Food Options", expanded=True, icon = ":material/expand_content:"):
-                        st.header("Food Options")
-                        
-                        # Add date and time box
-                        current_time = datetime.now(pytz.timezone('Asia/Singapore'))
-                        st.markdown(f"""
-                        <div class="date-time-box">
-                            Current Date and Time: {current_time.strftime("%Y-%m-%d %H:%M:%S")}
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # Create tabs
-                        tab1, tab2 = st.tabs(["All Food Options", "10 Random Food Options"])
+                    # Warm the caches while the map is sent to the browser for our best guess at the place the
+                    # details section will show: the first row under the persisted "Sort by" choice, which is the
+                    # place selector's default. A place the user picked by hand is not predicted.
+                    with thread_pool(max_workers=2) as ex:
+                        prefetches = []
+                        if not df_filtered.empty:
+                            sort_option = st.session_state.get("sort_option", next(iter(SORT_ORDERS)))
+                            default_place_id = sort_results(df_filtered, sort_option)['Place ID'].iloc[0]
+                            prefetches = [
+                                ex.submit(get_place_details_full, default_place_id, gmaps, rate_limiter),
+                                ex.submit(calculate_distance, (lat, lng), place_locations[default_place_id], gmaps, rate_limiter)
+                            ]
                         
-                        with tab1:
-                            if df_filtered.empty:
-                                st.warning("No results match your current filters. Try adjusting the filters.")
-                            else:
-                                sort_option = st.selectbox("Sort by:", ["Distance", "Price Level", "Rating", "Number of Reviews"])
-                                if sort_option == "Distance":
-                                    df_filtered = df_filtered.sort_values("Distance")
-                                elif sort_option == "Price Level":
-                                    df_filtered['Price Level'] = df_filtered['Price Level'].str.len()
-                                    df_filtered = df_filtered.sort_values("Price Level")
-                                    df_filtered['Price Level'] = df_filtered['Price Level'].apply(lambda x: '$' * x if x != 'N/A' else x)
-                                elif sort_option == "Rating":
-                                    df_filtered = df_filtered.sort_values("Rating", ascending=False)
-                                else:
-                                    df_filtered = df_filtered.sort_values("Number of Reviews", ascending=False)
-                                
-                                df_filtered['Rating'] = df_filtered['Rating'].apply(lambda x: f"{x:.1f}" if isinstance(x, (int, float)) else x)
-                                st.dataframe(df_filtered.drop(columns=['Place ID']).style.set_properties(**{'background-color': '#e0e7ff', 'color': '#1f2937'}))
+                        st.subheader("Map")
+                        m = create_map(lat, lng, places)
+                        folium_static(m, width=1300, height=500)
                         
-                        with tab2:
-                            if df_filtered.empty:
-                                st.warning("No results match your current filters. Try adjusting the filters.")
-                            else:
-                                # Function to generate random options
-                                def generate_random_options():
-                                    random_options = df_filtered.sample(n=min(10, len(df_filtered)))
-                                    random_options['Rating'] = random_options['Rating'].apply(lambda x: f"{x:.1f}" if isinstance(x, (int, float)) else x)
-                                    return random_options
-
-                                # Initialize session state for random options if it doesn't exist
-                                if 'random_options' not in st.session_state:
-                                    st.session_state.random_options = generate_random_options()
-
-                                # Button to regenerate random options
-                                if st.button("🔄 Generate New Options"):
-                                    st.session_state.random_options = generate_random_options()
-                                    st.balloons()
-
-                                # Display the random options
-                                st.dataframe(st.session_state.random_options.drop(columns=['Place ID']).style.set_properties(**{'background-color': '#e0e7ff', 'color': '#1f2937'}))
+                        # Only wait here; a failed prefetch was not cached and is retried and reported by render_results
+                        for future in prefetches:
+                            future.exception()
                     
-                    # 2nd expander section: Select a place for more details
-                    with st.expander("Select a place for more details", expanded=True, icon = ":material/expand_content:"):
-                        st.header("Select a place for more details")
-                        
-                        selected_place = st.selectbox("Select a place:", df_filtered['Name'])
-                        
-                        if selected_place:
-                            selected_place_id = df_filtered[df_filtered['Name'] == selected_place]['Place ID'].values[0]
-                            details = place_details[selected_place_id]
-                            
-                            st.subheader(f"Details for {selected_place}")
-                            
-                            detailed_data = {
-                                'Details': [
-                                    details.get('formatted_address', 'N/A'),
-                                    details.get('formatted_phone_number', 'N/A'),
-                                    details.get('website', 'N/A'),
-                                    '\n'.join(details.get('opening_hours', {}).get('weekday_text', ['N/A'])),
-                                    ', '.join(details.get('types', ['N/A'])),
-                                    f"{details.get('rating', 'N/A')}",
-                                    '$' * details.get('price_level', 0) or 'N/A',
-                                    details.get('user_ratings_total', 'N/A')
-                                ]
-                            }
-                            
-                            detailed_df = pd.DataFrame(detailed_data, index=['Address', 'Phone', 'Website', 'Opening Hours', 'Types', 'Rating', 'Price Level', 'Number of Reviews'])
-                            st.dataframe(detailed_df.style.set_properties(**{'background-color': '#e0e7ff', 'color': '#1f2937', 'white-space': 'pre-wrap', 'word-wrap': 'break-word'}))
-                    # 3rd expander section: Reviews
-                    with st.expander("Reviews", expanded=True, icon = ":material/expand_content:"):
-                        st.header("Reviews")
-                        
-                        if selected_place and 'reviews' in details:
-                            reviews = sorted(details['reviews'], key=lambda x: x['rating'], reverse=True)
-                            positive_reviews = [r for r in reviews if r['rating'] >= 4][:3]
-                            negative_reviews = [r for r in reviews if r['rating'] <= 2][-3:]
-                            
-                            st.subheader("Top Positive Reviews")
-                            if positive_reviews:
-                                for review in positive_reviews:
-                                    st.markdown(f"<p class='review-rating'>Rating: {'⭐' * int(review['rating'])}</p>", unsafe_allow_html=True)
-                                    st.markdown(f"<div class='review-text'>{review['text']}</div>", unsafe_allow_html=True)
-                            else:
-                                st.write("No positive reviews available.")
-                            
-                            st.subheader("Top Negative Reviews")
-                            if negative_reviews:
-                                for review in negative_reviews:
-                                    st.markdown(f"<p class='review-rating'>Rating: {'⭐' * int(review['rating'])}</p>", unsafe_allow_html=True)
-                                    st.markdown(f"<div class='review-text'>{review['text']}</div>", unsafe_allow_html=True)
-                            else:
-                                st.write("No negative reviews available.")
-                        else:
-                            st.write("No reviews available for this place.")
+                    render_results(lat, lng, df_filtered, place_locations, gmaps, rate_limiter)
                 else:
                     st.warning("No food options found in the specified radius. Try increasing the search radius.")
             else: